@@ -1,6 +1,7 @@
 from pvf_fun import *
 from training_model import BuildGrid
 import json
+import numpy as np
 
 
 class TrainModel(BuildGrid):
@@ -71,9 +72,14 @@ class TrainModel(BuildGrid):
                 
                 #Start coordinate from last trajectory used to update model
                 "last_used_start_point": self.last_start_coord,
-                "grid": self.grid.tolist(),
             }
             
+            #Grid is saved in binary form next to the json parameters
+            np.save(self.path2data+'model_grid.npy', self.grid)
+            
+            #Nodes updated with a zero vector are visited but hold zeros
+            np.save(self.path2data+'model_visited.npy', self.visited)
+            
             #Save model to working trajectory
             with open(self.path2data+'model.json', 'w+') as f:
                 json.dump(model, f)
@@ -162,6 +168,8 @@ class TrainModel(BuildGrid):
             self.av_trajectory = old_model["model_trajectory"]
             self.last_start_coord = old_model["last_used_start_point"]
             self.grid = old_model["grid"]
+            if old_model["visited"] is not None:
+                self.visited = old_model["visited"]
             print("Old model was read in.")
         
         #User passes nothing and wants to see last saved average trajectory
@@ -198,14 +206,14 @@ class TrainModel(BuildGrid):
             av_traj = self.av_traj(grid_start_point)
             
             #Ensure that model returned a trajectory
-            if av_traj == None:
+            if av_traj is None:
                 print(("Bad start point. Consider using a start point closer "
                        "to {}.".format(self.last_start_coord)))
                 return None
             else:
                 #Convert trajectory from grid space to task space
                 av_traj_ts = shift_traj(av_traj, self.shift2coord)
-                return av_traj_ts
+                return to_tuple_list(av_traj_ts)
 
         #Check for valid model
         try:
@@ -223,7 +231,7 @@ class TrainModel(BuildGrid):
             traj_ts = read_traj(self.path2data, traj_name)
             
             #Check for valid structuring of trajectory
-            if traj_ts == None:
+            if traj_ts is None:
                 print("Most recently provided trajectory is invalid.")
                 return None
             
@@ -233,7 +241,7 @@ class TrainModel(BuildGrid):
             
             #Check for duplicate coordinates
             traj_gs = check_extents(traj_ts2gs[0], self.grid_extents)
-            if traj_gs == None:
+            if traj_gs is None:
                 return None
             
             #Update model with trajectory
@@ -243,14 +251,15 @@ class TrainModel(BuildGrid):
             av_traj_gs = self.av_traj((traj_gs[0][0], traj_gs[0][1]))
 
             #If model could not generate a trajectory provide a warning
-            if av_traj_gs == None:
+            if av_traj_gs is None:
                 print(("Warning: Training trajectory {} compromised model.\n"
                       "Consider not saving model and using a node spacing > "
                       "{}.".format(traj_name, self.node_spacing)))
                 return None
                 
             else: #Convert trajectory from grid space back to trjectory space
-                self.av_trajectory = shift_traj(av_traj_gs, self.shift2coord)
+                self.av_trajectory = to_tuple_list(\
+                    shift_traj(av_traj_gs, self.shift2coord))
                 
                 #Update to the last start point
                 self.last_start_coord = self.av_trajectory[0]
@@ -266,7 +275,7 @@ class TrainModel(BuildGrid):
         
         #Check for duplicate coordinates and exceeded coordinate frame bounds
         traj_gs = check_extents(traj_ts2gs[0], traj_ts2gs[1])
-        if traj_gs == None: return None
+        if traj_gs is None: return None
         
         #Trajectory is valid, update class member variables
         extents_gs = traj_ts2gs[1]
@@ -294,7 +303,7 @@ class TrainModel(BuildGrid):
             grid_av_traj = self.av_traj((traj_gs[0][0], traj_gs[0][1]))
             
             #Training may proceed, but the most recent data broke the model
-            if grid_av_traj == None:
+            if grid_av_traj is None:
                 print("Warning: Training trajectory {} "
                       "compromised model.\nConsider using a node spacing "
                       "> {}.".format(traj_name, self.node_spacing))
@@ -302,8 +311,8 @@ class TrainModel(BuildGrid):
             
             #convert grid space trajectory back to tajectory space
             else:
-                self.av_trajectory =\
-                    shift_traj(grid_av_traj, self.shift2coord)
+                self.av_trajectory = to_tuple_list(\
+                    shift_traj(grid_av_traj, self.shift2coord))
                 self.last_start_coord = self.av_trajectory[0]
                 return self.av_trajectory
 
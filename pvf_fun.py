@@ -1,17 +1,87 @@
-import math
+import os
 import json
-import matplotlib.pyplot as plt
 import numpy as np
-import matplotlib.image as mpimg
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from training_model_fun import Y_FACT, GRID_DTYPE
 
-#Constant that scales a grid spacing to the height of a triangle
-Y_FACT = math.sqrt(3)/2
+#Messages printed when a trajectory does not fit the coordinate frame
+_EXTENTS_ERROR_MSG = ("Consider retraining model with larger extents,\n"
+                      "or excluding the most recent trajectory from training.\n")
+_GIVEN_EXTENTS_MSG = ("Trajectory exceeds given extents. Consider setting "
+                      "extents manually with :\nmin x<{}\nmax x>{}\nmin y<{}\n"
+                      "max y>{}, or do not train with this trajectory\n")
+
+
+def _as_array(traj):
+    
+    '''Trajectories are held as (N, 2) float64 arrays, one row per
+    coordinate. Callers may still pass a list of tuples, in which case it is
+    converted once here. Arrays that are already C-contiguous float64 are not
+    copied, so the NumPy kernels below always run over a single flat buffer.
+    
+    Args:
+    
+        traj: A trajectory, List[Tuple(Float, Float), ...] or npArray.
+        
+    Returns:
+    
+        traj_arr: npArray([[Float, Float], [Float, Float], ...]).
+    '''
+    
+    return np.ascontiguousarray(traj, dtype=np.float64)
+
+
+def _subtract_shift(traj, traj_arr, shift):
+    
+    '''Subtracts a shift vector from every coordinate of a trajectory. If
+    _as_array() had to build traj_arr from the caller's trajectory, the
+    array is private to this module and is shifted in place rather than
+    allocating a second N x 2 buffer. Arrays owned by the caller are never
+    modified.
+    
+    Args:
+    
+        traj: The trajectory as passed by the caller.
+        
+        traj_arr: The result of _as_array(traj), npArray.
+        
+        shift: The vector to subtract, List[Float, Float].
+        
+    Returns:
+    
+        shifted_traj: npArray([[Float, Float], [Float, Float], ...]).
+    '''
+    
+    out = traj_arr if traj_arr is not traj else None
+    return np.subtract(traj_arr, np.asarray(shift, dtype=np.float64), out=out)
+
+
+def to_tuple_list(traj):
+    
+    '''Converts an (N, 2) trajectory array to the list of coordinate tuples
+    returned to callers and written to saved models.
+    
+    Args:
+    
+        traj: A trajectory, npArray([[Float, Float], [Float, Float], ...]).
+        
+    Returns:
+    
+        traj_list: List[Tuple(Float, Float), Tuple(Float, Float), ...].
+    '''
+    
+    return list(map(tuple, _as_array(traj).tolist()))
 
 
 def open_model(file_path):
     
     '''Opens a model with the file name "model.json". The model is assumed
-    to have been generated by the caller.
+    to have been generated by the caller. The grid is stored alongside it as
+    "model_grid.npy" so it can be read back without JSON parsing, and the
+    mask of visited nodes as "model_visited.npy". Models saved with the grid
+    embedded in "model.json", or without a mask, are still supported. For
+    those, "visited" is None.
         
     Args:
     
@@ -27,20 +97,35 @@ def open_model(file_path):
     try:
         with open(file_path + "model.json", "r") as f:
             model = json.load(f)
-        #Convert grid from json to numpy array
-        grid2np = np.array(model["grid"])
-        model["grid"] = grid2np
-        return model
     except FileNotFoundError:
         return None
+    
+    #Older models embed the grid in the json file
+    if "grid" in model:
+        model["grid"] = np.array(model["grid"], dtype=GRID_DTYPE)
+    else:
+        try:
+            model["grid"] = np.load(file_path + "model_grid.npy")\
+                .astype(GRID_DTYPE, copy=False)
+        except FileNotFoundError:
+            print("Error: model.json found, but model_grid.npy is missing.")
+            return None
+    
+    #Older models hold no visited mask, caller rebuilds it from the grid
+    try:
+        model["visited"] = np.load(file_path + "model_visited.npy")\
+            .astype(np.bool_, copy=False)
+    except FileNotFoundError:
+        model["visited"] = None
+    return model
 
 
 def read_traj(file_path, file_name):
     
     '''Reads in trajectories for training. Trajectories are structured as
     two, space separated floating point values for x and y respectivel,
-    followed by an end line. This function parces characters and formats
-    them for use by PVF.
+    followed by an end line. The file is parsed by NumPy in a single pass and
+    formatted for use by PVF.
     
     Args:
     
@@ -52,30 +137,16 @@ def read_traj(file_path, file_name):
     
     Returns:
 
-        traj: A data type structured for use by PVF, List[Tuple(Float, Float),
-        Tuple(Float, Float), Tuple(Float, Float), ...].
+        traj: A data type structured for use by PVF, one row per coordinate,
+        npArray([[Float, Float], [Float, Float], ...]).
     '''
     
     try:
-        traj_file = open(file_path+"/"+file_name, "r")
-        traj = []
-        content = traj_file.readlines()
-        for line_char in content:
-            x_done = False
-            if line_char == "":
-                break
-            x_value = ""
-            y_value = ""
-            for one_char in line_char:
-                if one_char == " ":
-                    x_done = True
-                    pass
-                if x_done == False:
-                    x_value = x_value + one_char
-                if x_done:
-                    y_value = y_value + one_char
-            traj.append((float(x_value), float(y_value)))
-            traj_file.close()
+        traj_arr = np.loadtxt(os.path.join(file_path, file_name),\
+            dtype=np.float64, ndmin=2)
+        if traj_arr.shape[1] != 2:
+            raise ValueError
+        traj = traj_arr
     
     except FileNotFoundError:
         print("Trajectory file not found!")
@@ -89,6 +160,33 @@ def read_traj(file_path, file_name):
     return traj
 
 
+def read_traj_dir(file_path, workers=None):
+    
+    '''Reads every .txt trajectory file in a directory. Files are parsed
+    independently of one another, so they are spread across a pool of
+    worker processes.
+    
+    Args:
+    
+        file_path: Gives the relative path to the directory containing
+        trajectory files for training, String.
+        
+        workers: Maximum number of worker processes. If None, one process
+        per CPU is used, Int.
+    
+    Returns:
+    
+        trajs: Trajectories keyed by file name, in sorted file name order.
+        Files that could not be read map to None, Dict[String, npArray].
+    '''
+    
+    file_names = sorted(name for name in os.listdir(file_path)\
+        if name.endswith(".txt"))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        trajs = executor.map(partial(read_traj, file_path), file_names)
+        return dict(zip(file_names, trajs))
+
+
 def convert_traj_ts2gs(traj, node_spacing, extents = None,\
     shift2traj_coord = None):
     '''Recieves a trajectory in task space and converts it to a
@@ -123,7 +221,8 @@ def convert_traj_ts2gs(traj, node_spacing, extents = None,\
         
     Returns:
     
-        shifted_traj:
+        shifted_traj: The trajectory shifted to grid space,
+        npArray([[Float, Float], [Float, Float], ...]).
         
         grid_cart_extents: Grid space extents given task space trajectory size
         or task space coordinate frame extents. Values are given as x-min,
@@ -134,71 +233,96 @@ def convert_traj_ts2gs(traj, node_spacing, extents = None,\
         trajectory from grid space back to task space. List[Float, Float].
     '''
        
-    #initialize with valid guesses
-    min_x = traj[0][0]
-    min_y = traj[0][1]
-    max_x = traj[0][0]
-    max_y = traj[0][1]
+    traj_arr = _as_array(traj)
+    
+    #function is only being used to get a shifted trajectory
+    if shift2traj_coord != None:
+        traj_shift_gs2ts = [shift2traj_coord[0], shift2traj_coord[1]]
+        shifted_traj = _subtract_shift(traj, traj_arr, traj_shift_gs2ts)
+        return shifted_traj, None, traj_shift_gs2ts
     
     #find most extreme values of trajectory
-    for coord in traj:
-        if coord[0] < min_x:
-            min_x = coord[0]
-        if coord[0] > max_x:
-            max_x = coord[0]
-        if coord[1] < min_y:
-            min_y = coord[1]
-        if coord[1] > max_y:
-            max_y = coord[1]
-
-    #construct coordinate extents for grid space coordinate frame
-    grid_cart_extents = [None, None]
-    traj_shift_gs2ts = [None, None]
-    
-    #automatic assignment for extents
-    padding = 3 #add padding for coordinate frame
-    grid_cart_extents[0] = max_x - min_x + 2*padding*node_spacing
-    grid_cart_extents[1] = max_y - min_y + 2*padding*node_spacing*Y_FACT
+    min_x, min_y = traj_arr.min(axis=0).tolist()
+    max_x, max_y = traj_arr.max(axis=0).tolist()
     
-    #automatic assignment for shift
-    if shift2traj_coord == None:
-        traj_shift_gs2ts[0] = min_x - padding*node_spacing
-        traj_shift_gs2ts[1] = min_y - padding*node_spacing*Y_FACT
+    #automatic assignment for extents, add padding for coordinate frame
+    padding = 3
+    grid_cart_extents = [max_x - min_x + 2*padding*node_spacing,\
+        max_y - min_y + 2*padding*node_spacing*Y_FACT]
     
-    #If extents are not passed it is automatically assignment
+    #for user assigned extents, not using automatic extents assignment
     if extents != None:
         diff_x = extents[1] - extents[0]
         diff_y = extents[3] - extents[2]
         if diff_x < grid_cart_extents[0] or diff_y < grid_cart_extents[1]:            
-            print(("Trajectory exceeds given extents. Consider setting"
-"extents manually with :\nmin x<{}\nmax x>{}\nmin y<{}\nmax y>{}, or do not"
-"train with this trajectory\n".format(extents[0], extents[1], extents[2], extents[3])))
+            print(_GIVEN_EXTENTS_MSG.format(*extents))
             return None
-        
-    #for user assigned extents, not using automatic extents assignment
-    if extents != None:
-        grid_cart_extents[0] = extents[1] - extents[0]
-        grid_cart_extents[1] = extents[3] - extents[2]
-        traj_shift_gs2ts[0] = extents[0]
-        traj_shift_gs2ts[1] = extents[2]
+        grid_cart_extents = [diff_x, diff_y]
+        traj_shift_gs2ts = [extents[0], extents[2]]
     
-    #function is only being used to get a shifted trajectory
-    if shift2traj_coord != None:
-        traj_shift_gs2ts[0] = shift2traj_coord[0]
-        traj_shift_gs2ts[1] = shift2traj_coord[1]
-        grid_cart_extents = None
-        shift2traj_coord = None
-    
-    shifted_traj = [] #shift coordinates for used with the model
-    for coord in traj:
-        shifted_grid_coord = (coord[0] - traj_shift_gs2ts[0], coord[1] -\
-            traj_shift_gs2ts[1])
-        
-        #shifted trajectory to grid coordinates
-        shifted_traj.append(shifted_grid_coord)
+    #automatic assignment for shift
+    else:
+        traj_shift_gs2ts = [min_x - padding*node_spacing,\
+            min_y - padding*node_spacing*Y_FACT]
+    
+    #shifted trajectory to grid coordinates
+    shifted_traj = _subtract_shift(traj, traj_arr, traj_shift_gs2ts)
     return shifted_traj, grid_cart_extents, traj_shift_gs2ts
 
 
+def _exceeds_extents(traj_arr, extents):
+    
+    '''Bounds test used by check_extents() when extents are given. Grid
+    space has its origin at (0, 0), so every coordinate must lie between
+    the origin and the upper extents.
+    
+    Args:
+    
+        traj_arr: Trajectory in grid space, npArray([[Float, Float], ...]).
+        
+        extents: x-max and y-max of grid space, List[Float, Float].
+        
+    Returns:
+    
+        exceeded: True if any coordinate lies outside of the extents.
+    '''
+    
+    min_x, min_y = traj_arr.min(axis=0).tolist()
+    max_x, max_y = traj_arr.max(axis=0).tolist()
+    if min_x < 0: print("Error: tajectory crosses y-axis")
+    elif min_y < 0: print("Error: tajectory crosses x-axis")
+    elif max_x > extents[0]: print("Error: tajectory exceeds x-axis limit")
+    elif max_y > extents[1]: print("Error: tajectory exceeds y-axis limit")
+    else: return False
+    print(_EXTENTS_ERROR_MSG)
+    return True
+
+
+def _remove_duplicates(traj_arr):
+    
+    '''Removes consecutive duplicate coordinates, keeping the first of any
+    run of repeated coordinates.
+    
+    Args:
+    
+        traj_arr: Trajectory, npArray([[Float, Float], ...]).
+        
+    Returns:
+    
+        traj_fixed: Trajectory with duplicates removed, npArray.
+    '''
+    
+    dup_mask = np.all(traj_arr[1:] == traj_arr[:-1], axis=1)
+    if not dup_mask.any():
+        return traj_arr
+    keep = np.concatenate(([True], ~dup_mask))
+    print("Trajectory contains", int(dup_mask.sum()),\
+        "duplicate coordinates that are being removed\n")
+    for removed_coord in map(tuple, traj_arr[~keep].tolist()):
+        print("Coordinate", removed_coord, 'was removed.')
+    return traj_arr[keep]
+
+
 def check_extents(traj, extents):
     
     '''Consecutive duplicate coordinates in a trajectory are not permitted.
@@ -208,77 +332,39 @@ def check_extents(traj, extents):
     
     Args:
 
-        extents: x-min, x-max, y-min, and y-max, List[Float, Float, Float,
-        Float].
+        extents: x-max and y-max of the grid space coordinate frame. If None
+        only duplicates are removed, List[Float, Float].
         
         traj: Trajectory possibly containing consecutive, duplicate
         coordinates, or coordinates that exceed frame extents,
-        List[Tuple(Float, Float), Tuple(Float, Float), ...].
+        npArray([[Float, Float], [Float, Float], ...]).
                 
     Returns:
         
         traj_fixed: Trajectory with duplicates removed, if any, 
-        List[Tuple(Float, Float), Tuple(Float, Float), ...].
+        npArray([[Float, Float], [Float, Float], ...]).
         
         None: Returned if coordinate frame extents are breached.
     '''
     
     #Check for correct data types and format
-    if traj == None or isinstance(traj, list) == False:
-        print("Trajectory provided is not a list.")
+    if traj is None or isinstance(traj, (list, np.ndarray)) == False:
+        print("Trajectory provided is not a list or array.")
         return None
-    duplicates_index_list = []
-    for i in range(len(traj) - 1):
-        if traj[i][0] == traj[i+1][0] and traj[i][1] == traj[i+1][1]:
-            duplicates_index_list.insert(0, i+1)
-        
-        #check if coordinates exceed gs extents
-        error_msg = "Consider retraining model with larger extents."
-        if extents != None:
-            if traj[i][0] < 0:
-                print("Error: tajectory crosses y-axis")
-                print(error_msg)
-                return None
-            if traj[i][1] < 0:
-                print("Error: tajectory crosses x-axis")
-                print(error_msg)
-                return None
-            if traj[i][0] > extents[0]:
-                print("Error: tajectory exceeds x-axis limit")
-                print(error_msg)
-                return None
-            if traj[i][1] > extents[1]:
-                print("Error: tajectory exceeds x-axis limit")
-                print(error_msg)
-                return None
-            
-        #cover the case for reaching last coordinate in trajectory
-        if i == len(traj)-1:
-            if traj[i+1][0] < 0:
-                print("Error: tajectory crosses y-axis")
-                print(error_msg)
-                return None
-            if traj[i+1][1] < 0:
-                print("Error: tajectory crosses x-axis")
-                print(error_msg)
-                return None
-            if traj[i+1][0] > extents[0]:
-                print("Error: tajectory exceeds x-axis limit")
-                print(error_msg)
-                return None
-            if traj[i+1][0] > extents[0]:
-                print("Error: tajectory exceeds x-axis limit")
-                print(error_msg)
-                return None
-    
-    traj_fixed = traj                    
-    if len(duplicates_index_list) != 0:
-        print("Trajectory contains", len(duplicates_index_list),\
-            "duplicate coordinates that are being removed\n")
-        for index in duplicates_index_list:
-            removed_coord = traj_fixed.pop(index)
-            print("Coordinate", removed_coord, 'was removed.')
-    return traj_fixed
+    traj_arr = _as_array(traj)
+    
+    #An empty trajectory has nothing to check or remove
+    if len(traj_arr) == 0:
+        return traj_arr.reshape(0, 2)
+    
+    #Without extents only duplicates need to be handled
+    if extents is None:
+        return _remove_duplicates(traj_arr)
+    
+    #check if coordinates exceed gs extents
+    if _exceeds_extents(traj_arr, extents):
+        return None
+    return _remove_duplicates(traj_arr)
 
 
 def shift_traj(traj, shift):
@@ -302,14 +388,11 @@ def shift_traj(traj, shift):
     Returns:
         
         traj_shifted: The shifted tajectory. All points along the trajectory
-        are displaced by the shift vector, List[tuple(Float, Float), 
-        tuple(Float, Float), ...].
+        are displaced by the shift vector, npArray([[Float, Float],
+        [Float, Float], ...]).
     '''
     
-    traj_shifted = []
-    for c in traj:
-        coord = (c[0] + shift[0], c[1] + shift[1])
-        traj_shifted.append(coord)
+    traj_shifted = _as_array(traj) + np.asarray(shift, dtype=np.float64)
     return traj_shifted
 
     
@@ -332,15 +415,13 @@ def find_shortest_seg(traj):
         
         shortest_segment: The shortest segment encountered in the passed
         trajectory, Float.
+        
+        None: If the trajectory has fewer than two coordinates.
     '''
-    shortest_segment = None
-    for i in range(len(traj) - 1):
-        seg_length = math.sqrt((traj[i][0] - traj[i+1][0])**2 + (traj[i][1] -\
-            traj[i+1][1])**2)
-        if shortest_segment == None:
-            shortest_segment = seg_length
-        if seg_length < shortest_segment:
-            shortest_segment = seg_length
+    if len(traj) < 2:
+        return None
+    seg_vecs = np.diff(_as_array(traj), axis=0)
+    shortest_segment = float(np.hypot(seg_vecs[:, 0], seg_vecs[:, 1]).min())
     return shortest_segment
 
 
@@ -374,6 +455,15 @@ def plot_trajectory(*args, title="data", **kwargs):
     '''
     
     
+    #Nothing to draw, avoid importing matplotlib
+    if not args or all(d is None or len(d) == 0 for d in args):
+        return
+    
+    #Plotting is optional, defer the matplotlib import until it is used
+    import matplotlib.pyplot as plt
+    import matplotlib.image as mpimg
+    from matplotlib.collections import LineCollection
+    
     #Allows user to specify coordinate ext
     extents = kwargs.get("extents")
     
@@ -388,20 +478,25 @@ def plot_trajectory(*args, title="data", **kwargs):
         ax.imshow(img, extent=extents)
         
     else:
-        ax = plt
+        ax = plt.gca()
 
     #Add plots of trajectories
     colors = ["blue", "orange", "green", "red", "purple", "brown", "pink", "gray", "olive", "cyan"] 
     marker_shape = ["o", "s", "^", "v", "o", "s", "*", "D", "h", "p"]
     mark_ind = 0
+    data_min = np.full(2, np.inf)
+    data_max = np.full(2, -np.inf)
     for data in args:
-        for i in range(len(data) -1): 
-            x1 = data[i][0]
-            y1 = data[i][1]
-            x2 = data[i+1][0]
-            y2 = data[i+1][1]
-            ax.plot([x1, x2], [y1, y2], c=colors[mark_ind])
-            ax.scatter(x1, y1, c=colors[mark_ind], marker=marker_shape[mark_ind])
+        if data is not None and len(data) != 0:
+            data_arr = _as_array(data)
+            data_min = np.minimum(data_min, data_arr.min(axis=0))
+            data_max = np.maximum(data_max, data_arr.max(axis=0))
+            
+            #One collection of segments and one scatter per trajectory
+            segs = np.stack([data_arr[:-1], data_arr[1:]], axis=1)
+            ax.add_collection(LineCollection(segs, colors=colors[mark_ind]))
+            ax.scatter(data_arr[:-1, 0], data_arr[:-1, 1],\
+                c=colors[mark_ind], marker=marker_shape[mark_ind])
         mark_ind += 1
         if mark_ind + 1 > len(colors):
             mark_ind = 0
@@ -411,50 +506,19 @@ def plot_trajectory(*args, title="data", **kwargs):
         plt.xlim(extents[0], extents[1])
         plt.ylim(extents[2], extents[3])
     
+    #Background image sets its own limits, otherwise fit the trajectories
+    elif img_name != None:
+        ax.autoscale_view()
+    else:
+        pad = 0.05*(data_max - data_min)
+        pad[pad == 0] = 1
+        ax.set_xlim(data_min[0] - pad[0], data_max[0] + pad[0])
+        ax.set_ylim(data_min[1] - pad[1], data_max[1] + pad[1])
+    
     plt.title(title)
     plt.show()
     plt.close()
 
-def update_node(self, vec, node_indices):
-        
-        '''Function overwrite in training_model.py.
-        
-        Args:
-        
-            vec: A vector being used for the update,
-            npArray([Float, Float]).
-            
-            node_indices: The indices of the node being updated, [Int, Int].
-        
-        Returns:
-        
-            N/A
-        '''
-        
-        ind_i = node_indices[0]
-        ind_j = node_indices[1]
-        
-        #A node's fist visit, populate nodes if empty
-        if self.grid[ind_i][ind_j][0] == 0 and \
-            self.grid[ind_i][ind_j][1] == 0:
-            self.grid[ind_i][ind_j][0] = vec[0]
-            self.grid[ind_i][ind_j][1] = vec[1]
-        
-        #Nodes not empty, update must consider previous value
-        else:
-            hist_vec = np.array([self.grid[ind_i][ind_j][0],\
-                self.grid[ind_i][ind_j][1]])
-            len_hist_vec = np.linalg.norm(hist_vec)
-            len_vec = np.linalg.norm(vec)
-            
-            #Biases grid towards retaining longer vectors
-            scale_fact = len_vec/(len_vec + len_hist_vec)
-            diff_vec = np.subtract(vec, hist_vec)
-            scaled_diff_vec = diff_vec*scale_fact
-            updated_vec = np.add(hist_vec, scaled_diff_vec)
-            self.grid[ind_i][ind_j][0] = updated_vec[0]
-            self.grid[ind_i][ind_j][1] = updated_vec[1]
-
 if __name__ == "__main__":
 
     pass
\ No newline at end of file
@@ -0,0 +1,38 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from pvf import TrainModel
+
+
+class TestSaveModel(unittest.TestCase):
+
+    def test_visited_mask_survives_reload(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_dir = data_dir + "/"
+            np.savetxt(data_dir + "traj.txt",
+                       [[0, 0], [3, 0], [6, 0], [9, 3], [12, 6]])
+            with redirect_stdout(io.StringIO()):
+                model = TrainModel(3)
+                model.train_on_trajectory(path=data_dir, file_name="traj.txt")
+
+                #A node visited by a zero vector holds no non-zero data
+                model.visited[1, 1] = True
+                model.grid_x[1, 1] = 0
+                model.grid_y[1, 1] = 0
+                model.save_model()
+
+                reloaded = TrainModel(3)
+                reloaded.train_on_trajectory(path=data_dir,
+                                             start_point=(0.5, 0.5))
+
+            self.assertTrue(os.path.exists(data_dir + "model_visited.npy"))
+            np.testing.assert_array_equal(reloaded.visited, model.visited)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from pvf_fun import check_extents
+
+
+class TestCheckExtents(unittest.TestCase):
+
+    def test_empty_trajectory(self):
+        for extents in (None, [5, 5]):
+            traj_fixed = check_extents([], extents)
+            self.assertEqual(traj_fixed.shape, (0, 2))
+
+    def test_duplicates_removed(self):
+        traj = [(1.0, 1.0), (1.0, 1.0), (2.0, 2.0)]
+        with redirect_stdout(io.StringIO()):
+            traj_fixed = check_extents(traj, [5, 5])
+        np.testing.assert_array_equal(traj_fixed, [[1.0, 1.0], [2.0, 2.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
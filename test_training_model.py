@@ -0,0 +1,84 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from training_model import BuildGrid, _LEFT
+from training_model_fun import coord_from_ind
+
+
+class TestUpdateGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.model = BuildGrid(node_spacing=1.0)
+        self.model.set_coord_frame_extents([10, 10])
+
+    def test_trajectory_starting_on_edge(self):
+        #Start location's trident reaches past the upper and right edges
+        traj = np.array([[9.9, 9.9], [9, 9], [8, 8]])
+        with redirect_stdout(io.StringIO()):
+            self.model.update_grid(traj)
+        self.assertFalse(self.model.visited.any())
+
+    def test_zero_length_segment(self):
+        #Repeated coordinates are rejected before any node is updated
+        traj = np.array([[5.0, 5.0], [5.0, 5.0], [6.0, 6.0]])
+        with redirect_stdout(io.StringIO()) as out:
+            self.model.update_grid(traj)
+        self.assertFalse(self.model.visited.any())
+        self.assertNotIn("Model failed", out.getvalue())
+
+
+class TestAvTraj(unittest.TestCase):
+
+    def test_walk_ending_past_left_edge(self):
+        model = BuildGrid(node_spacing=1.0)
+        model.set_coord_frame_extents([20, 20])
+        traj = np.column_stack((np.linspace(12, 0.3, 25), np.full(25, 6.0)))
+        with redirect_stdout(io.StringIO()):
+            model.update_grid(traj)
+            av_traj = model.av_traj((12.0, 6.0))
+
+        #Last trident has a node at i = -1, the walk must stay at the edge
+        #rather than jump to the node wrapped around to the far side
+        self.assertLess(av_traj[-1][0], 1.0)
+        self.assertLess(np.hypot(model.grid_x, model.grid_y).max(), 2.0)
+
+
+class TestTwoEmptyNodes(unittest.TestCase):
+
+    def test_left_only_populates_right_and_center(self):
+        model = BuildGrid(node_spacing=1.0)
+        model.set_coord_frame_extents([10, 10])
+        indices = ((3, 4), (4, 4), (3, 5))
+        model.update_node((0.5, 0.25), indices[0])
+        triad_vecs = [(0.5, 0.25), (0.0, 0.0), (0.0, 0.0)]
+
+        new_loc = model.two_empty_nodes((3.6, 3.7), triad_vecs, _LEFT,
+                                        indices)
+
+        #Right and center nodes point where the left node points
+        loc_left = coord_from_ind(indices[0], 1.0)
+        points_to = (loc_left[0] + 0.5, loc_left[1] + 0.25)
+        for ind in indices[1:]:
+            self.assertTrue(model.visited[ind])
+            loc_node = coord_from_ind(ind, 1.0)
+            self.assertAlmostEqual(model.grid_x[ind],
+                                   points_to[0] - loc_node[0], places=6)
+            self.assertAlmostEqual(model.grid_y[ind],
+                                   points_to[1] - loc_node[1], places=6)
+        np.testing.assert_allclose(new_loc, (4.1, 3.95))
+
+
+class TestGridProperty(unittest.TestCase):
+
+    def test_grid_snapshot_is_read_only(self):
+        model = BuildGrid(node_spacing=1.0)
+        model.set_coord_frame_extents([10, 10])
+        with self.assertRaises(ValueError):
+            model.grid[1, 1] = (1.0, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from training_model_fun import coords_from_inds, find_trident, find_tridents
+
+
+class TestFindTridents(unittest.TestCase):
+
+    def test_matches_find_trident(self):
+        node_sp = 3.0
+        rng = np.random.default_rng(0)
+        inds = rng.integers(0, 20, (200, 2))
+
+        #Random coordinates plus ties on nodes and between neighbors
+        path_locs = np.vstack((
+            rng.uniform(0, 60, (1000, 2)),
+            coords_from_inds(inds, node_sp),
+            (coords_from_inds(inds, node_sp) +
+                coords_from_inds(inds + [1, 0], node_sp))/2,
+            (coords_from_inds(inds, node_sp) +
+                coords_from_inds(inds + [0, 1], node_sp))/2))
+
+        tridents = find_tridents(path_locs, node_sp)
+        for path_loc, trident in zip(path_locs.tolist(), tridents.tolist()):
+            expected = find_trident(path_loc, node_sp)
+            self.assertEqual([ind for pair in trident for ind in pair],
+                             list(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
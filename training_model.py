@@ -1,7 +1,15 @@
 from training_model_fun import *
 import math
 import numpy as np
-import matplotlib.pyplot as plt
+
+#Bits of the triad visited mask for the left, right, and center nodes
+_LEFT = 0b100
+_RIGHT = 0b010
+_CENTER = 0b001
+
+#Long segments with at least this many increments locate their tridents in
+#one batch, shorter ones one increment at a time
+_BATCH_MIN_INCREMENTS = 16
 
 
 class BuildGrid:
@@ -115,9 +123,97 @@ class BuildGrid:
         nom_node_count_y = self.grid_extents[1]/node_spacing_in_y
         node_count_y = math.ceil(nom_node_count_y)
         
-        #Parameter list includes vector x and y components
-        param_list = 2
-        self.grid = np.zeros((node_count_x, node_count_y, param_list))
+        #Vector x and y components are kept in separate arrays
+        self.grid_x = np.zeros((node_count_x, node_count_y), dtype=GRID_DTYPE)
+        self.grid_y = np.zeros_like(self.grid_x)
+        
+        #Nodes that have been populated with a vector
+        self.visited = np.zeros(self.grid_x.shape, dtype=np.bool_)
+        
+        self.set_grid_geometry()
+    
+    
+    @property
+    def grid(self):
+        
+        '''The grid as a single array of node vectors. Internally the x and y
+        components are stored as the separate arrays grid_x and grid_y so
+        that walks over one component stay contiguous in memory. The array
+        is a read-only snapshot assembled on access and is meant for saving
+        and inspecting a model. Writes to it raise a ValueError, a model is
+        updated through grid_x, grid_y, and visited, or by assigning a whole
+        new grid.
+        
+        Returns:
+        
+            grid: Read-only npArray with shape (node count x, node count y,
+            2).
+        '''
+        
+        grid = np.stack((self.grid_x, self.grid_y), axis=-1)
+        grid.flags.writeable = False
+        return grid
+    
+    
+    @grid.setter
+    def grid(self, grid):
+        
+        '''Loads a grid of node vectors, e.g. one read from a saved model.
+        Nodes holding non-zero vectors are marked as visited. A saved visited
+        mask should be assigned to visited afterwards, since nodes updated
+        with a zero vector are visited too.
+        
+        Args:
+        
+            grid: npArray with shape (node count x, node count y, 2).
+        '''
+        
+        grid = np.asarray(grid, dtype=GRID_DTYPE)
+        self.grid_x = np.ascontiguousarray(grid[:, :, 0])
+        self.grid_y = np.ascontiguousarray(grid[:, :, 1])
+        
+        #Without a saved visited mask, populated nodes are taken as non-zero
+        self.visited = (self.grid_x != 0) | (self.grid_y != 0)
+        
+        self.set_grid_geometry()
+    
+    
+    def set_grid_geometry(self):
+        
+        '''Caches geometry that depends only on the grid dimensions and node
+        spacing, and must be refreshed whenever the grid is replaced. This
+        includes the grid space location of every node, which replaces calls
+        to coord_from_ind() with lookups where indices are known to lie
+        within the grid. Tridents met by av_traj() may hang off the grid on
+        the final step, so the triad helpers keep calculating node locations.
+        Also cached is the region of grid space where any coordinate is at
+        least two node spacings from the outermost nodes. A trident found for
+        such a coordinate always lies within the grid, so check_extents() can
+        accept it without locating the trident.
+        
+        Args:
+            
+            N/A.
+        
+        Returns:
+            
+            N/A.
+        '''
+        
+        node_count_x, node_count_y = self.grid_x.shape
+        
+        #Node locations for every index, same layout as coord_from_ind()
+        node_inds = np.stack(np.meshgrid(np.arange(node_count_x),\
+            np.arange(node_count_y), indexing='ij'), axis=-1)
+        node_locs = coords_from_inds(node_inds, self.node_spacing)
+        self._node_x = np.ascontiguousarray(node_locs[:, :, 0])
+        self._node_y = np.ascontiguousarray(node_locs[:, :, 1])
+        
+        #Interior region in which check_extents() can skip find_trident()
+        self._safe_x_lo = 2*self.node_spacing
+        self._safe_x_hi = (node_count_x - 2)*self.node_spacing
+        self._safe_y_lo = 2*self.node_spacing
+        self._safe_y_hi = (node_count_y - 2)*self.node_spacing*Y_FACT
         
             
     def check_extents(self, loc, check_type):
@@ -150,19 +246,24 @@ class BuildGrid:
         #Checks if a "trident" (three neighboring nodes) exceeds a limit
         if check_type == "triangle":
             
+            #Well inside the grid every trident is valid, skip the search
+            if self._safe_x_lo < loc[0] < self._safe_x_hi and\
+                self._safe_y_lo < loc[1] < self._safe_y_hi: return False
+            
             #Coordinates on the coordinate frame axese are prohibited
             if loc[0] == 0 or loc[1] == 0: return True
             
             #The triangle of 3 nearest nodes is defined here as a "trident"
-            [left_ind, right_ind, center_ind] = \
+            i_left, j_left, i_right, j_right, i_center, j_center =\
                 find_trident(loc, self.node_spacing)
+            node_count_x, node_count_y = self.grid_x.shape
                 
-            if left_ind[0] < 0 or\
-                left_ind[1] + 1 > self.grid.shape[1] or\
-                left_ind[1] < 0 or\
-                right_ind[0] + 1 > self.grid.shape[0] or\
-                center_ind[1] < 0 or\
-                center_ind[1] + 1 > self.grid.shape[1]: exceeded = True
+            if i_left < 0 or\
+                j_left + 1 > node_count_y or\
+                j_left < 0 or\
+                i_right + 1 > node_count_x or\
+                j_center < 0 or\
+                j_center + 1 > node_count_y: exceeded = True
                 
         return exceeded
     
@@ -200,7 +301,7 @@ class BuildGrid:
         Args:
         
             vec: A vector being used for the update,
-            npArray([Float, Float]).
+            Tuple(Float, Float).
             
             node_indices: The indices of the node being updated, [Int, Int].
         
@@ -214,51 +315,54 @@ class BuildGrid:
         
         ind_i = node_indices[0]
         ind_j = node_indices[1]
+        grid_x = self.grid_x
+        grid_y = self.grid_y
+        v0 = vec[0]
+        v1 = vec[1]
 
         #A node's fist visit, populate nodes if empty
-        if self.grid[ind_i][ind_j][0] == 0 and \
-            self.grid[ind_i][ind_j][1] == 0:
-            self.grid[ind_i][ind_j][0] = vec[0]
-            self.grid[ind_i][ind_j][1] = vec[1]
+        if not self.visited[ind_i, ind_j]:
+            self.visited[ind_i, ind_j] = True
+            grid_x[ind_i, ind_j] = v0
+            grid_y[ind_i, ind_j] = v1
         
         #Nodes not empty, update must consider previous value
         else:
-            #Convert vector in grid to np vector
-            hist_vec = np.array([self.grid[ind_i][ind_j][0],\
-                self.grid[ind_i][ind_j][1]])
-            
-            #Dot current vector into vector saved in node
-            dot_prod = np.dot(vec, hist_vec)
+            h0 = grid_x.item(ind_i, ind_j)
+            h1 = grid_y.item(ind_i, ind_j)
             
             #Length update vector
-            len_vec = np.linalg.norm(vec)
+            len_vec = math.hypot(v0, v1)
             
-            #Length vector already in node
-            len_hist_vec = np.linalg.norm(hist_vec)
+            #A zero length update has no direction, node is left as is
+            if len_vec == 0: return
             
-            #Find the angle between both vectors
-            cos_theta = dot_prod / (len_vec*len_hist_vec)
+            #Length vector already in node
+            len_hist_vec = math.hypot(h0, h1)
             
-            #Handle potential floating-point errors
-            cos_theta = np.clip(cos_theta, -1, 1)
+            #A visited node holding a zero vector has no direction to keep
+            if len_hist_vec == 0:
+                angle_deg = 180
+            else:
+                #Find the angle between both vectors
+                cos_theta = (v0*h0 + v1*h1) / (len_vec*len_hist_vec)
+                
+                #Handle potential floating-point errors
+                cos_theta = min(max(cos_theta, -1), 1)
 
-            angle_rad = np.arccos(cos_theta)
-            angle_deg = np.degrees(angle_rad)
+                angle_deg = math.degrees(math.acos(cos_theta))
             
             #Direction has changed, overwrite node
             if angle_deg > self.direction_angle:
-                self.grid[ind_i][ind_j][0] = vec[0]
-                self.grid[ind_i][ind_j][1] = vec[1]
+                grid_x[ind_i, ind_j] = v0
+                grid_y[ind_i, ind_j] = v1
             
             #New vec is same direction as node, average the vectors
             else:
                 #Biases grid towards retaining longer vectors
                 scale_fact = len_vec/(len_vec + len_hist_vec)
-                diff_vec = np.subtract(vec, hist_vec)
-                scaled_diff_vec = diff_vec*scale_fact
-                updated_vec = np.add(hist_vec, scaled_diff_vec)
-                self.grid[ind_i][ind_j][0] = updated_vec[0]
-                self.grid[ind_i][ind_j][1] = updated_vec[1]
+                grid_x[ind_i, ind_j] = h0 + scale_fact*(v0 - h0)
+                grid_y[ind_i, ind_j] = h1 + scale_fact*(v1 - h1)
     
     
     def zero_empty_node(self, loc, triad_vecs, indices):
@@ -277,8 +381,8 @@ class BuildGrid:
             Tuple(Float, Float).
              
             triad_vecs: The three triad vectors that were gathered
-            from the triad of nodes, List[npArray([Float, Float]), 
-            npArray([Float, Float])], npArray([Float, Float])].
+            from the triad of nodes, List[Tuple(Float, Float), 
+            Tuple(Float, Float), Tuple(Float, Float)].
             
             indices: Indices of the nodes to the left, right, and center 
             (above or below) the location of interest respectively, 
@@ -286,8 +390,8 @@ class BuildGrid:
             
         Returns:
 
-            loc_np_array: Coordinate of next point in the calculated
-            trajectory, npArray([Float, Float])
+            new_loc: Coordinate of next point in the calculated
+            trajectory, Tuple(Float, Float).
         '''
         
         #determine distances to neighboring grid nodes
@@ -304,19 +408,16 @@ class BuildGrid:
         weight_right = (dist2center + dist2left - dist2right)/den
         weight_center = (dist2left + dist2right - dist2center)/den
         
-        #Weight the vectors
-        vec_left_weighted = weight_left*triad_vecs[0]
-        vec_right_weighted = weight_right*triad_vecs[1]
-        vec_center_weighted = weight_center*triad_vecs[2]
-        
         #Sum weighted vectors
-        vec_l_plus_r = np.add(vec_left_weighted, vec_right_weighted)
-        vec_sum = np.add(vec_l_plus_r, vec_center_weighted)
-        loc_np_array = loc + vec_sum
-        return loc_np_array
+        vec_left, vec_right, vec_center = triad_vecs
+        new_loc = (loc[0] + (weight_left*vec_left[0] +\
+            weight_right*vec_right[0] + weight_center*vec_center[0]),\
+                loc[1] + (weight_left*vec_left[1] +\
+                    weight_right*vec_right[1] + weight_center*vec_center[1]))
+        return new_loc
     
         
-    def one_empty_node(self, loc, triad_vecs, visited_nodes, indices):
+    def one_empty_node(self, loc, triad_vecs, visited_mask, indices):
         
         '''Calculates a new coordinate based on a triad of grid vectors even
         though one of those nodes had no triad vector, i.e. it was never
@@ -333,14 +434,13 @@ class BuildGrid:
             Tuple(Float, Float).
             
             triad_vecs: The three triad vectors that were gathered
-            from the triad of nodes, List[npArray([Float, Float]), 
-            npArray([Float, Float])], npArray([Float, Float])].
+            from the triad of nodes, List[Tuple(Float, Float), 
+            Tuple(Float, Float), Tuple(Float, Float)].
             
-            visited_nodes: Boolean value indicating whether or not a node
-            had been visited previously, 1 for had been visited, 0 for a node
-            that had not been visited (contains no vector). The index position
-            corresponds to the left, right, and center triad nodes 
-            respectively, List[Int].
+            visited_mask: Bit mask of the triad nodes that had been visited
+            previously. The left, right, and center nodes are given by the
+            bits _LEFT, _RIGHT, and _CENTER respectively, a set bit marks a
+            visited node and a clear bit one that contains no vector, Int.
             
             indices: Indices of the nodes to the left, right, and center 
             (above or below) the location of interest respectively, 
@@ -348,8 +448,8 @@ class BuildGrid:
             
         Returns:
 
-            loc_np_array: Coordinate of next point in the calculated
-            trajectory, npArray([Float, Float]).
+            new_loc: Coordinate of next point in the calculated
+            trajectory, Tuple(Float, Float).
             
         '''
         
@@ -360,86 +460,70 @@ class BuildGrid:
             indices[1], self.node_spacing)
         dist2center = dist2node(loc,\
             indices[2], self.node_spacing)
+        vec_left, vec_right, vec_center = triad_vecs
         
         #Left node empty, use right and center
-        if visited_nodes == [False, True, True]:
+        if visited_mask == _RIGHT | _CENTER:
                                 
             #Determine weights based on distances to nodes
             den = dist2right + dist2center
             weight_right = dist2right/den
             weight_center = dist2center/den
             
-            #Weight the vectors
-            vec_right_weighted = weight_right*triad_vecs[1]
-            vec_center_weighted = weight_center*triad_vecs[2]
-            
             #Calculate sum of weighted vectors
-            vec_r_plus_c = np.add(vec_right_weighted,\
-                vec_center_weighted)
-            loc_np_array = loc + vec_r_plus_c
+            new_loc = (loc[0] + (weight_right*vec_right[0] +\
+                weight_center*vec_center[0]), loc[1] +\
+                    (weight_right*vec_right[1] + weight_center*vec_center[1]))
             
             #Populate empty node
             loc_left = coord_from_ind(indices[0], self.node_spacing)
-            vec_left = np.subtract(loc_np_array, loc_left)
-            self.update_node(vec_left, indices[0])
+            self.update_node((new_loc[0] - loc_left[0],\
+                new_loc[1] - loc_left[1]), indices[0])
             
-            return loc_np_array
+            return new_loc
             
         #Right node empty, use center and left
-        if visited_nodes == [True, False, True]:
+        elif visited_mask == _LEFT | _CENTER:
             
             #Determine weights based on distances to nodes
             den = dist2left + dist2center
             weight_left = dist2left/den
             weight_center = dist2center/den
             
-            #Weight the vectors
-            vec_left_weighted = weight_left*triad_vecs[0]
-            vec_center_weighted = weight_center*triad_vecs[2]
-            
             #Calculate sum of weighted vectors
-            vec_l_plus_c = np.add(vec_left_weighted,\
-                vec_center_weighted)
-            loc_np_array = loc + vec_l_plus_c
+            new_loc = (loc[0] + (weight_left*vec_left[0] +\
+                weight_center*vec_center[0]), loc[1] +\
+                    (weight_left*vec_left[1] + weight_center*vec_center[1]))
             
             #Populate empty node
             loc_right = coord_from_ind(indices[1], self.node_spacing)
-            vec_right = np.subtract(loc_np_array, loc_right)
-            self.update_node(vec_right, indices[1])
+            self.update_node((new_loc[0] - loc_right[0],\
+                new_loc[1] - loc_right[1]), indices[1])
             
-            return loc_np_array
+            return new_loc
             
         #Center node empty, use left and right
-        if visited_nodes == [True, True, False]:
+        elif visited_mask == _LEFT | _RIGHT:
             
             #Determine weights based on distances to nodes
             den = dist2left + dist2right
             weight_left = dist2left/den
             weight_right = dist2right/den
             
-            #Weight the vectors
-            vec_left_weighted = weight_left*triad_vecs[0]
-            vec_right_weighted = weight_right*triad_vecs[1]
-            
             #Calculate sum of weighted vectors
-            vec_l_plus_r = np.add(vec_left_weighted,\
-                vec_right_weighted)
-            loc_np_array = loc + vec_l_plus_r
+            new_loc = (loc[0] + (weight_left*vec_left[0] +\
+                weight_right*vec_right[0]), loc[1] +\
+                    (weight_left*vec_left[1] + weight_right*vec_right[1]))
             
             #Populate empty node
             loc_center = coord_from_ind(indices[2], self.node_spacing)
-            vec_center = np.subtract(loc_np_array, loc_center)
-            self.update_node(vec_center, indices[2])
+            self.update_node((new_loc[0] - loc_center[0],\
+                new_loc[1] - loc_center[1]), indices[2])
             
-            #Calculate sum of weighted vectors
-            vec_l_plus_r = np.add(vec_left_weighted,\
-                vec_right_weighted)
-            loc_np_array = loc + vec_l_plus_r
-            
-            return loc_np_array
+            return new_loc
 
 
-    def two_empty_nodes(self, loc, triad_vecs, visited_nodes, indices):
+    def two_empty_nodes(self, loc, triad_vecs, visited_mask, indices):
         
         '''This function is similar to one_empty_node() in that it calculates
         the next coordinate based on an incomplete triad of nodes.
@@ -456,11 +540,10 @@ class BuildGrid:
             loc: Last coordinate added to the growing, calculated list,
             Tuple(Float, Float).
             
-            visited_nodes: Boolean value indicating whether or not a node
-            had been visited previously, 1 for had been visited, 0 for a node
-            that had not been visited (contains no vector). The index position
-            corresponds to the left, right, and center triad nodes 
-            respectively, List[Int].
+            visited_mask: Bit mask of the triad nodes that had been visited
+            previously. The left, right, and center nodes are given by the
+            bits _LEFT, _RIGHT, and _CENTER respectively, a set bit marks a
+            visited node and a clear bit one that contains no vector, Int.
             
             indices: Indices of the nodes to the left, right, and center 
             (above or below) the location of interest respectively, 
@@ -468,49 +551,52 @@ class BuildGrid:
             
         Returns:
 
-            loc_np_array:  Coordinate of next point in the calculated
-            trajectory, npArray([Float, Float]).
+            new_loc: Coordinate of next point in the calculated
+            trajectory, Tuple(Float, Float).
         '''
         
         #Calculate location of nodes
         loc_left = coord_from_ind(indices[0], self.node_spacing)
         loc_right = coord_from_ind(indices[1], self.node_spacing)
         loc_center = coord_from_ind(indices[2], self.node_spacing)
+        vec_left, vec_right, vec_center = triad_vecs
         
         #Right and center nodes were empty, use left to update
-        if visited_nodes[0] == [True, False, False]:
-            loc_left_points_to = np.add(loc_left, triad_vecs[0])
-            vec_right = np.subtract(loc_left_points_to, loc_right)
-            vec_center = np.subtract(loc_left_points_to, loc_center)
+        if visited_mask == _LEFT:
+            points_to = (loc_left[0] + vec_left[0], loc_left[1] + vec_left[1])
             
             #Populate any empty nodes
-            self.update_node(vec_right, indices[1])
-            self.update_node(vec_center, indices[2])
+            self.update_node((points_to[0] - loc_right[0],\
+                points_to[1] - loc_right[1]), indices[1])
+            self.update_node((points_to[0] - loc_center[0],\
+                points_to[1] - loc_center[1]), indices[2])
         
         #Left and center nodes were empty, use right to update
-        if visited_nodes == [False, True, False]:
-            loc_right_points_to = np.add(loc_right, triad_vecs[1])
-            vec_left = np.subtract(loc_right_points_to, loc_left)
-            vec_center = np.subtract(loc_right_points_to, loc_center)
+        elif visited_mask == _RIGHT:
+            points_to = (loc_right[0] + vec_right[0],\
+                loc_right[1] + vec_right[1])
             
             #Populate any empty nodes
-            self.update_node(vec_left, indices[0])
-            self.update_node(vec_center, indices[2])
+            self.update_node((points_to[0] - loc_left[0],\
+                points_to[1] - loc_left[1]), indices[0])
+            self.update_node((points_to[0] - loc_center[0],\
+                points_to[1] - loc_center[1]), indices[2])
         
         #Left and right nodes were empty, use center to update
-        if visited_nodes == [False, False, True]:
-            loc_center_points_to = np.add(loc_center, triad_vecs[2])
-            vec_right = np.subtract(loc_center_points_to, loc_right)
-            vec_left = np.subtract(loc_center_points_to, loc_left)
+        elif visited_mask == _CENTER:
+            points_to = (loc_center[0] + vec_center[0],\
+                loc_center[1] + vec_center[1])
             
             #Populate any empty nodes
-            self.update_node(vec_left, indices[0])
-            self.update_node(vec_right, indices[1])
+            self.update_node((points_to[0] - loc_left[0],\
+                points_to[1] - loc_left[1]), indices[0])
+            self.update_node((points_to[0] - loc_right[0],\
+                points_to[1] - loc_right[1]), indices[1])
         
         #All vectors point to same place, use of left is arbitrary
-        loc_np_array = loc + triad_vecs[0]
+        new_loc = (loc[0] + vec_left[0], loc[1] + vec_left[1])
         
-        return loc_np_array
+        return new_loc
 
     
     def av_traj(self, loc_start):
@@ -528,8 +614,8 @@ class BuildGrid:
         Returns:
 
             av_traj: This calculated pseudo-average trajectory is the primary
-            output of training, List[Tuple(Float, Float), Tuple(Float, Float),
-            ...].
+            output of training, npArray([[Float, Float], [Float, Float],
+            ...]).
         
             None: If trajectory calculation fails. This implies something is
             wrong with the grid model, or there was a start position located
@@ -542,8 +628,25 @@ class BuildGrid:
                    "node_spacing=<spacing> for instantiation"))
             return None
         
-        #Psuedo-average trajectory calculation preparation
-        av_traj = [loc_start]    
+        #Attributes read on every step are bound to locals once
+        node_spacing = self.node_spacing
+        grid_x = self.grid_x
+        grid_y = self.grid_y
+        visited = self.visited
+        max_coord_count = self.max_coord_count
+        average_path_length = self.average_path_length
+        shortest_segment = self.shortest_segment
+        
+        #Margin% applied to comparisons against training history
+        margin = 50
+        margin_fact = 0.01*margin
+        max_coord_limit = max_coord_count + round(margin_fact*max_coord_count)
+        
+        #Psuedo-average trajectory calculation preparation, the buffer is
+        #sized for the longest trajectory allowed by the stop checks below
+        av_traj = np.empty((max(64, max_coord_limit + 8), 2))
+        av_traj[0] = loc_start
+        coord_count = 1
         loc = loc_start
         running_path_length = 0
         stop_calc = False
@@ -551,85 +654,82 @@ class BuildGrid:
         #Continues growing pseudo-average trajectory until a stop is generated
         while stop_calc == False:
             
-            #Last coordinate added, loc wich grows in while loop
-            loc = av_traj[-1]
-            
             #Check that nodes in the triad exceed grid space limits
             stop_calc = self.check_extents(loc, "triangle")
                 
             #Gather indices neighboring nodes
-            indices = find_trident(loc, self.node_spacing)
+            i_left, j_left, i_right, j_right, i_center, j_center =\
+                find_trident(loc, node_spacing)
+            indices = ((i_left, j_left), (i_right, j_right),\
+                (i_center, j_center))
                 
             #Gather vectors recorded in triad of neighboring nodes
-            vec_left = np.array([self.grid[indices[0][0]][indices[0][1]][0],\
-                self.grid[indices[0][0]][indices[0][1]][1]])
-            vec_right = np.array([self.grid[indices[1][0]][indices[1][1]][0],\
-                self.grid[indices[1][0]][indices[1][1]][1]])
-            vec_center = np.array([self.grid[indices[2][0]]\
-                [indices[2][1]][0],\
-                    self.grid[indices[2][0]][indices[2][1]][1]])
+            vec_left = (grid_x.item(i_left, j_left),\
+                grid_y.item(i_left, j_left))
+            vec_right = (grid_x.item(i_right, j_right),\
+                grid_y.item(i_right, j_right))
+            vec_center = (grid_x.item(i_center, j_center),\
+                grid_y.item(i_center, j_center))
             triad_vecs = [vec_left, vec_right, vec_center]
             
-            #Determine if triad nodes were visited previously
-            left_visited = False
-            right_visited = False
-            center_visited = False
-            if np.linalg.norm(vec_left) != 0: left_visited = True
-            if np.linalg.norm(vec_right) != 0: right_visited = True
-            if np.linalg.norm(vec_center) != 0: center_visited = True
-            visited_nodes = [left_visited, right_visited, center_visited]
+            #Determine which triad nodes were visited previously
+            visited_mask = _LEFT*visited.item(i_left, j_left) |\
+                _RIGHT*visited.item(i_right, j_right) |\
+                    _CENTER*visited.item(i_center, j_center)
             
-            #Calculated pseudo average proceeds based on 3 cases
-            num_nodes_visited = left_visited + right_visited + center_visited
+            #case 4 - All 3 nodes are non-zero (best case and most typical)
+            if visited_mask == _LEFT | _RIGHT | _CENTER:
+                new_loc = self.zero_empty_node(loc, triad_vecs, indices)
             
             #Case 1 - All nodes are empty so abort, model fails
-            if num_nodes_visited == 0:
+            elif visited_mask == 0:
                 return None
             
             #Case 2 - Two of three nodes are empty, but recoverable
-            if num_nodes_visited == 1:
-                loc_np_array = self.two_empty_nodes(loc, triad_vecs, visited_nodes, indices)
+            elif visited_mask in (_LEFT, _RIGHT, _CENTER):
+                new_loc = self.two_empty_nodes(loc, triad_vecs, visited_mask,\
+                    indices)
                     
             #Case 3 - One of three nodes were zero
-            if num_nodes_visited == 2:
-                loc_np_array = self.one_empty_node(loc, triad_vecs, visited_nodes, indices)
-                
-            #case 4 - All 3 nodes are non-zero (best case and most typical)
-            if num_nodes_visited == 3:
-                loc_np_array = self.zero_empty_node(loc, triad_vecs, indices)
-            
-            #Needed because NumPy array won't append to list
-            new_loc = (loc_np_array[0].tolist(), loc_np_array[1].tolist())
-            
-            #Update running path length to ensure path does not run on forever
-            new_length = math.sqrt((new_loc[0]-loc[0])**2 + \
-                (new_loc[1]-loc[1])**2)
-            running_path_length = running_path_length + new_length
+            else:
+                new_loc = self.one_empty_node(loc, triad_vecs, visited_mask,\
+                    indices)
             
             #Check if done
             if new_loc == loc:
                 break
             
-            #Margin% applied to comparisons against training history
-            margin = 50
+            #Update running path length to ensure path does not run on forever
+            dx = new_loc[0] - loc[0]
+            dy = new_loc[1] - loc[1]
+            new_length = math.sqrt(dx*dx + dy*dy)
+            running_path_length = running_path_length + new_length
+            
+            #Any one check stops the calculation, cheapest checks go first
             
             #Check for excessive coordinate count
-            if len(av_traj) > self.max_coord_count +\
-                round(0.01*margin*self.max_coord_count):
+            if coord_count > max_coord_limit:
                 stop_calc = True
             
-            #Check for excessively short segements
-            if self.shortest_segment > new_length +\
-                round(0.01*margin*new_length): stop_calc = True
-            
-            #check that trajectory path is not much longer than average            
-            if self.average_path_length < running_path_length:
+            #check that trajectory path is not much longer than average
+            elif average_path_length < running_path_length:
                 stop_calc = True
             
-            #Grow trajectory by one coordinate
-            av_traj.append(new_loc)
+            #Check for excessively short segements, only possible for
+            #segments shorter than the shortest training segment
+            elif new_length < shortest_segment and shortest_segment >\
+                new_length + round(margin_fact*new_length): stop_calc = True
+            
+            #Grow trajectory by one coordinate, doubling buffer if full
+            if coord_count == av_traj.shape[0]:
+                av_traj = np.concatenate((av_traj, np.empty_like(av_traj)))
+            av_traj[coord_count] = new_loc
+            coord_count += 1
+            
+            #Last coordinate added, loc wich grows in while loop
+            loc = new_loc
             
-        return av_traj
+        return av_traj[:coord_count]
 
     
     def update_grid(self, traj):
@@ -638,8 +738,8 @@ class BuildGrid:
         
         Args:
         
-            traj: A training trajectory, List[Tuple(Float, Float), 
-            Tuple(Float, Float), ...]
+            traj: A training trajectory, npArray([[Float, Float],
+            [Float, Float], ...])
             
         Returns:
         
@@ -647,7 +747,7 @@ class BuildGrid:
         '''
         
         try:
-            if traj == None:
+            if traj is None:
                 raise ValueError
         except ValueError:            
             print('Error: Trajectory is type None')
@@ -672,95 +772,129 @@ class BuildGrid:
         if coord_count > self.max_coord_count:
             self.max_coord_count = coord_count
         
-        #check later to see if there are any zero length segments
-        zero_length_seg_present = False
-        next_ind = 0
-        for loc in traj:
-            
-            #Occurrs for consecutive repeated coordinates
-            if shortest_segment == 0:
-                print("Invalid trajectory with zero length segment")
-                zero_length_seg_present = True
-            
-            #check that location in trajectory is valid
-            exceeded = self.check_extents(loc, "triangle")
-            if exceeded or zero_length_seg_present: break
-            else:
-                #Reached end of traj list
-                if len(traj) == next_ind + 1: break
+        #Attributes read on every step are bound to locals once
+        node_spacing = self.node_spacing
+        node_x = self._node_x
+        node_y = self._node_y
+        update_node = self.update_node
+        traj_pts = np.asarray(traj, dtype=np.float64)
+        
+        #Occurrs for consecutive repeated coordinates, nothing is updated
+        if shortest_segment == 0:
+            print("Invalid trajectory with zero length segment")
+            valid_count = 0
+        
+        #Training stops at the first location with an invalid trident
+        else:
+            valid_count = len(traj_pts)
+            
+            #Tridents well inside the grid are valid, only check the rest
+            interior = (self._safe_x_lo < traj_pts[:, 0]) &\
+                (traj_pts[:, 0] < self._safe_x_hi) &\
+                    (self._safe_y_lo < traj_pts[:, 1]) &\
+                        (traj_pts[:, 1] < self._safe_y_hi)
+            for ind in np.flatnonzero(~interior).tolist():
+                if self.check_extents(traj_pts[ind], "triangle"):
+                    valid_count = ind
+                    break
+        
+        #Each segment starts at a valid location, the next may be invalid
+        valid_locs = traj_pts[:valid_count + 1].tolist()
+        for loc_current, loc_next in zip(valid_locs, valid_locs[1:]):
+            
+            #vector from current location to next along trajectory
+            dx = loc_next[0] - loc_current[0]
+            dy = loc_next[1] - loc_current[1]
+            
+            #length of current vector
+            vec_len_vec2next_traj_pt = math.hypot(dx, dy)
+            
+            #Next location is close, no nodes between to update
+            if vec_len_vec2next_traj_pt < node_spacing:
+                i_left, j_left, i_right, j_right, i_center, j_center =\
+                    find_trident(loc_current, node_spacing)
                 
-                #Vector to next location
-                loc_current = np.array([loc[0], loc[1]])
-                next_ind += 1
-                loc_next = np.array([traj[next_ind][0], traj[next_ind][1]])
+                #Look up location of nodes
+                loc_left = (node_x.item(i_left, j_left),\
+                    node_y.item(i_left, j_left))
+                loc_right = (node_x.item(i_right, j_right),\
+                    node_y.item(i_right, j_right))
+                loc_center = (node_x.item(i_center, j_center),\
+                    node_y.item(i_center, j_center))
                 
-                #vector from current location to next along trajectory
-                vec2next_traj_pt = np.subtract(loc_next, loc_current)
+                #Calculate vector from nodes to trajectory
+                vec_left2traj_next = (loc_next[0] - loc_left[0],\
+                    loc_next[1] - loc_left[1])
+                vec_right2traj_next = (loc_next[0] - loc_right[0],\
+                    loc_next[1] - loc_right[1])
+                vec_center2traj_next = (loc_next[0] - loc_center[0],\
+                    loc_next[1] - loc_center[1])
                 
-                #length of current vector
-                vec_len_vec2next_traj_pt = np.linalg.norm(vec2next_traj_pt)
+                #Upate nodes with trajectory
+                update_node(vec_left2traj_next, (i_left, j_left))
+                update_node(vec_right2traj_next, (i_right, j_right))
+                update_node(vec_center2traj_next, (i_center, j_center))
                 
-                #Next location is close, no nodes between to update
-                if vec_len_vec2next_traj_pt < self.node_spacing:
-                    [left_ind, right_ind, center_ind] =\
-                        find_trident(loc_current, self.node_spacing)
-                    
-                    #Find location of nodes
-                    loc_left = coord_from_ind(left_ind, self.node_spacing)
-                    loc_right = coord_from_ind(right_ind, self.node_spacing)
-                    loc_center = coord_from_ind(center_ind, self.node_spacing)
-                    
-                    #Calculate vector from nodes to trajectory
-                    vec_left2traj_next = np.subtract(loc_next, loc_left)
-                    vec_right2traj_next = np.subtract(loc_next, loc_right)
-                    vec_center2traj_next = np.subtract(loc_next, loc_center)
-                    
-                    #Upate nodes with trajectory
-                    self.update_node(vec_left2traj_next, left_ind)
-                    self.update_node(vec_right2traj_next, right_ind)
-                    self.update_node(vec_center2traj_next, center_ind)
-                    
+            
+            #Next location is far, must update nodes in between
+            else:
+                #find direction of increment
+                hat_x = dx/vec_len_vec2next_traj_pt
+                hat_y = dy/vec_len_vec2next_traj_pt
                 
-                #Next location is far, must update nodes in between
-                else:
-                    #find direction of increment
-                    vec_hat_vec2next_traj_pt =\
-                        vec2next_traj_pt/vec_len_vec2next_traj_pt
-                    
-                    #Divide current vector into peices to increment
-                    n_inc = math.floor(\
-                        vec_len_vec2next_traj_pt/self.node_spacing)                    
-                    
-                    #Creep along long distance, populate nodes along the way   
+                #Divide current vector into peices to increment
+                n_inc = math.floor(\
+                    vec_len_vec2next_traj_pt/node_spacing)
+                
+                #Creep along long distance, few increments one at a time
+                if n_inc < _BATCH_MIN_INCREMENTS:
                     for j in range(n_inc):
-                        len_of_vec_increment = (j)*self.node_spacing
-                        loc_of_increment = np.add(loc_current,\
-                            vec_hat_vec2next_traj_pt*len_of_vec_increment)
-                        [left_ind, right_ind, center_ind] = \
-                            find_trident(loc_of_increment, self.node_spacing)
-                        
-                        loc_left = coord_from_ind(left_ind, self.node_spacing)
-                        loc_right = coord_from_ind(right_ind,\
-                            self.node_spacing)
-                        loc_center = coord_from_ind(center_ind,\
-                            self.node_spacing)
+                        len_of_vec_increment = j*node_spacing
+                        loc_inc = (loc_current[0] +\
+                            hat_x*len_of_vec_increment, loc_current[1] +\
+                                hat_y*len_of_vec_increment)
+                        i_left, j_left, i_right, j_right, i_center,\
+                            j_center = find_trident(loc_inc, node_spacing)
                         
-                        vec_left2traj_next = np.subtract(loc_next, loc_left)
-                        vec_right2traj_next = np.subtract(loc_next, loc_right)
-                        vec_center2traj_next =\
-                            np.subtract(loc_next, loc_center)
-                        
-                        self.update_node(vec_left2traj_next, left_ind)
-                        self.update_node(vec_right2traj_next, right_ind)
-                        self.update_node(vec_center2traj_next, center_ind)
+                        #Increments are not bounds checked, node locations
+                        #are calculated rather than looked up
+                        for node_ind in ((i_left, j_left),\
+                            (i_right, j_right), (i_center, j_center)):
+                            node_loc = coord_from_ind(node_ind, node_spacing)
+                            update_node((loc_next[0] - node_loc[0],\
+                                loc_next[1] - node_loc[1]), node_ind)
+                
+                #Many increments, locations of all increments at once
+                else:
+                    len_of_vec_increments = np.arange(n_inc)*node_spacing
+                    locs_of_increments = np.column_stack((\
+                        loc_current[0] + hat_x*len_of_vec_increments,\
+                        loc_current[1] + hat_y*len_of_vec_increments))
                 
-                #Run calculated average to boaden grid along trajectory
-                traj_test = self.av_traj(traj[0])
+                    #Trident of each increment, shape (n_inc, 3, 2)
+                    trident_inds = find_tridents(locs_of_increments,\
+                        node_spacing)
                 
-                #Encountered a trident of unvisited nodes
-                if traj_test == None:
-                    print("Warning: Model failed to calculate trajectory.\n")
-                    pass
+                    #Vectors from every trident node to next trajectory point
+                    vecs2traj_next = np.subtract(loc_next,\
+                        coords_from_inds(trident_inds, node_spacing))
+                
+                    #Node updates depend on order, populate them in sequence
+                    for inds, vecs in zip(trident_inds.tolist(),\
+                        vecs2traj_next.tolist()):
+                        for node_ind, vec in zip(inds, vecs):
+                            update_node(vec, node_ind)
+    
+        #No segment was trained, nothing to broaden and the start location
+        #may not have a valid trident
+        if len(valid_locs) < 2: return None
+        
+        #Run calculated average once to boaden grid along trajectory
+        traj_test = self.av_traj((traj[0][0], traj[0][1]))
+        
+        #Encountered a trident of unvisited nodes
+        if traj_test is None:
+            print("Warning: Model failed to calculate trajectory.\n")
                
                 
     def plot_grid(self):
@@ -776,31 +910,23 @@ class BuildGrid:
             N/A.
         '''
         
-        #For large grids the program may appear to hang
-        print("Warning, for large grids this can take a long time to plot.\n")
+        #Plotting is optional, defer the matplotlib import until it is used
+        import matplotlib.pyplot as plt
+        
+        #Node locations for every index
+        node_x = self._node_x
+        node_y = self._node_y
+        
+        #Visited nodes are red, empty nodes are blue
+        vec_x = self.grid_x
+        vec_y = self.grid_y
+        colors = np.where(self.visited, 'r', 'b')
         
-        vec_list = []
-        for i in range(self.grid.shape[0]):
-            for j in range(self.grid.shape[1]):
-                V = np.array([self.grid[i][j][0], self.grid[i][j][1]])
-                vec_list.append(V)
         fig, ax = plt.subplots()
-
-        # Add vectors V and W to the plot
-        for i in range(self.grid.shape[0]):
-            print(f"plot {round(100*i/self.grid.shape[0], 1)}% done", end="\r")
-            for j in range(self.grid.shape[1]):
-                node_loc = coord_from_ind((i, j), self.node_spacing)
-                list_index = j+i*self.grid.shape[1]
-                if vec_list[list_index][0] == 0 and\
-                    vec_list[list_index][1] == 0:
-                    color = 'b'
-                else:
-                    color = 'r'
-                ax.quiver(node_loc[0], node_loc[1], vec_list[list_index][0],\
-                    vec_list[list_index][1], angles='xy', scale_units='xy',\
-                        scale=1, color=color)
-        node_loc = coord_from_ind((self.grid.shape[0], self.grid.shape[1]),\
+        ax.quiver(node_x.ravel(), node_y.ravel(), vec_x.ravel(),\
+            vec_y.ravel(), angles='xy', scale_units='xy', scale=1,\
+                width=0.0075, color=colors.ravel().tolist())
+        node_loc = coord_from_ind(self.grid_x.shape,\
             self.node_spacing)
         plt.title("Trained Path Vector Field")
         ax.set_xlim([0, node_loc[0]])
@@ -1,7 +1,11 @@
 import math
+import numpy as np
 
 #Constant that scales a grid spacing to the height of a triangle
-Y_FACT = math.sqrt(3)/2
+Y_FACT = 0.8660254037844386 #sqrt(3)/2
+
+#Storage type of grid vectors, deltas of a few node spacings need no float64
+GRID_DTYPE = np.float32
 
 
 def coord_from_ind(ind, node_sp):
@@ -26,6 +30,29 @@ def coord_from_ind(ind, node_sp):
     return coord
 
 
+def coords_from_inds(inds, node_sp):
+    
+    '''Vectorized form of coord_from_ind() for many nodes at once.
+    
+    Args:
+        inds: Grid indices with the i and j index along the last axis,
+        npArray([..., [Int, Int]])
+        
+        node_sp: Spacing of grid nodes, Float
+        
+    Returns:
+
+        coords: Grid space coordinates with the same leading shape as inds,
+        npArray([..., [Float, Float]])
+    '''
+    
+    inds = np.asarray(inds)
+    coords = np.empty(inds.shape, dtype=np.float64)
+    coords[..., 0] = inds[..., 0]*node_sp + (inds[..., 1] % 2)*(node_sp/2)
+    coords[..., 1] = inds[..., 1]*node_sp*Y_FACT
+    return coords
+
+
 def dist2node(loc, node_ind, node_sp):
     
     '''Calculates the distance between a trajectory coordinate and a grid
@@ -45,7 +72,7 @@ def dist2node(loc, node_ind, node_sp):
     '''
     
     node_loc = coord_from_ind(node_ind, node_sp)
-    dist = math.sqrt((loc[0] - node_loc[0])**2 + (loc[1] - node_loc[1])**2)
+    dist = math.hypot(loc[0] - node_loc[0], loc[1] - node_loc[1])
     return dist
 
 
@@ -64,13 +91,8 @@ def path_length(traj):
         overall_length: Total trajectory length, Float
     '''
     
-    last_coord = traj[0]
-    overall_length = 0
-    for coord in traj:
-        dist = math.sqrt((coord[0]-last_coord[0])**2 +\
-            (coord[1]-last_coord[1])**2)
-        overall_length = overall_length + dist
-        last_coord = coord
+    seg_vecs = np.diff(np.asarray(traj, dtype=np.float64), axis=0)
+    overall_length = float(np.hypot(seg_vecs[:, 0], seg_vecs[:, 1]).sum())
     return overall_length
 
 
@@ -128,11 +150,11 @@ def find_trident(path_loc, node_sp):
     
     Returns: 
 
-        left_ind: Indices of the left node, [int, int, int]
+        i_left, j_left: Indices of the left node, Int, Int
         
-        right_ind: Indices of the right node, [int, int, int]
+        i_right, j_right: Indices of the right node, Int, Int
         
-        center_ind: Indices of the center node, [int, int, int]
+        i_center, j_center: Indices of the center node, Int, Int
     '''
     
     #Setup unit vectors for dotting into
@@ -247,11 +269,82 @@ def find_trident(path_loc, node_sp):
             i_center = cls_ind[0]
         else: i_center = cls_ind[0] - 1
         j_center = cls_ind[1] - 1
-    left_ind = (i_left, j_left)
-    right_ind = (i_right, j_left)
-    center_ind = (i_center, j_center)
     
-    return (left_ind, right_ind, center_ind)
+    #Left and right nodes share a row
+    return i_left, j_left, i_right, j_left, i_center, j_center
+
+
+#Unit vectors of the 6 quadrant boundaries, see find_trident()
+_UNIT_VECS = np.array([(-1, 0), (-0.5, Y_FACT), (0.5, Y_FACT), (1, 0),\
+    (0.5, -Y_FACT), (-0.5, -Y_FACT)])
+
+#Trident index offsets from the closest node for quadrants I to VI, for the
+#closest node on an unshifted and on a shifted row. Each row gives i and j of
+#the left, right, and center nodes, same cases as find_trident()
+_TRIDENT_OFFSETS = np.array([
+    [[-1, 0, 0, 0, -1, 1], [-1, 0, 0, 0, 0, 1]],
+    [[-1, 1, 0, 1, 0, 0], [0, 1, 1, 1, 0, 0]],
+    [[0, 0, 1, 0, 0, 1], [0, 0, 1, 0, 1, 1]],
+    [[0, 0, 1, 0, 0, -1], [0, 0, 1, 0, 1, -1]],
+    [[-1, -1, 0, -1, 0, 0], [0, -1, 1, -1, 0, 0]],
+    [[-1, 0, 0, 0, -1, -1], [-1, 0, 0, 0, 0, -1]]])
+
+
+def find_tridents(path_locs, node_sp):
+    
+    '''Vectorized form of find_trident() for many coordinates at once. The
+    same quadrant selection is made, including how ties between dot
+    products are broken, so each row matches find_trident() for that
+    coordinate.
+    
+    Args:
+
+        path_locs: Cartesian coordinates within grid space,
+        npArray([[Float, Float], ...])
+        
+        node_sp: Node spacing of grid, Float
+    
+    Returns: 
+
+        tridents: Indices of the left, right, and center nodes for each
+        coordinate, npArray with shape (N, 3, 2) of Int.
+    '''
+    
+    path_locs = np.asarray(path_locs, dtype=np.float64)
+    
+    #Closest node, rounds half to even like find_index_closest()
+    j_closest = np.round(path_locs[:, 1]/(node_sp*Y_FACT))
+    cls_shift = (j_closest % 2).astype(np.intp)
+    i_closest = np.round(path_locs[:, 0]/node_sp - cls_shift/2)
+    cls_inds = np.column_stack((i_closest, j_closest)).astype(np.intp)
+    
+    #Dot products with unit vectors, only positive ones select a quadrant
+    offset = path_locs - coords_from_inds(cls_inds, node_sp)
+    dots = offset[:, :1]*_UNIT_VECS[:, 0] + offset[:, 1:]*_UNIT_VECS[:, 1]
+    dots = np.where(dots > 0, dots, 0)
+    
+    #Largest and 2nd largest dot product, ties go to the lower index
+    rows = np.arange(len(dots))
+    index_largest = np.argmax(dots, axis=1)
+    dot_largest = dots[rows, index_largest]
+    dots[rows, index_largest] = -1
+    index_2nd_largest = np.argmax(dots, axis=1)
+    
+    #With a single positive dot product the 2nd largest stays at index 0
+    index_2nd_largest[dots[rows, index_2nd_largest] <= 0] = 0
+    
+    #All quadrants equally valid, arbitrarily picking quadrant I
+    index_2nd_largest[(dot_largest <= 0) |\
+        ((index_largest == 0) & (index_2nd_largest == 0))] = 1
+    index_largest[dot_largest <= 0] = 0
+    
+    #Neighboring unit vectors k and k + 1 bound quadrant k
+    quadrant = np.where((index_largest - index_2nd_largest) % 6 == 1,\
+        index_2nd_largest, index_largest)
+    
+    offsets = _TRIDENT_OFFSETS[quadrant, cls_shift]
+    tridents = offsets + np.tile(cls_inds, 3)
+    return tridents.reshape(-1, 3, 2)
 
 
 def traj_metrics(traj):
@@ -281,24 +374,16 @@ def traj_metrics(traj):
     #Number of coordinates in trajectory
     coord_count = len(traj)
     
+    #Segment lengths are found once and reduced for both metrics
+    seg_vecs = np.diff(np.asarray(traj, dtype=np.float64), axis=0)
+    seg_lengths = np.hypot(seg_vecs[:, 0], seg_vecs[:, 1])
+    
     #Find shortest segment
-    shortest_segment = None
-    for i in range(coord_count - 1):
-        seg_length = math.sqrt((traj[i][0] - traj[i+1][0])**2 + (traj[i][1] -\
-            traj[i+1][1])**2)
-        if shortest_segment == None:
-            shortest_segment = seg_length
-        if seg_length < shortest_segment:
-            shortest_segment = seg_length
+    if coord_count < 2: shortest_segment = None
+    else: shortest_segment = float(seg_lengths.min())
     
     #find trajectory length
-    last_coord = traj[0]
-    overall_length = 0
-    for coord in traj:
-        dist = math.sqrt((coord[0]-last_coord[0])**2 +\
-            (coord[1]-last_coord[1])**2)
-        overall_length = overall_length + dist
-        last_coord = coord
+    overall_length = float(seg_lengths.sum())
     
     return shortest_segment, coord_count, overall_length
 